@@ -12,8 +12,9 @@ def test_audio_capture():
     print("🔍 Audio Capture Test")
     print("=" * 50)
     
-    # List all devices
+    # List all devices (queried once; input devices collected in the same pass)
     devices = sd.query_devices()
+    input_devices = []
     print("\n📱 Available Audio Devices:")
     for i, device in enumerate(devices):
         name = device.get('name', 'Unknown')
@@ -24,11 +25,7 @@ def test_audio_capture():
         if "blackhole" in name.lower():
             print(f"      ⭐ BLACKHOLE DEVICE FOUND!")
         print()
-    
-    # Find input devices
-    input_devices = []
-    for i, device in enumerate(devices):
-        if device.get('max_input_channels', 0) > 0:
+        if inputs > 0:
             input_devices.append(i)
     
     if not input_devices:
@@ -39,7 +36,7 @@ def test_audio_capture():
     
     # Test first input device
     device_id = input_devices[0]
-    device_info = sd.query_devices(device_id)
+    device_info = devices[device_id]
     device_name = device_info.get('name', 'Unknown')
     
     print(f"\n🎯 Testing device #{device_id}: {device_name}")
@@ -56,7 +53,8 @@ def test_audio_capture():
         sd.wait()
         
         # Analyze
-        rms = np.sqrt(np.mean(audio_data**2))
+        x = audio_data.ravel()
+        rms = np.sqrt(np.dot(x, x) / x.size)
         db = 20 * np.log10(max(rms, 1e-10))
         
         print(f"\n📊 Results:")
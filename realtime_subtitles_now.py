@@ -11,8 +11,80 @@ from tkinter import font as tkfont
 import threading
 import queue
 import time
+import math
 import os
 
+try:
+    from numba import njit
+except ImportError:  # optional: fall back to NumPy
+    njit = None
+
+# Levels span -60..0 dBFS; the RMS is clamped to this range before log10.
+# The result is still clamped to 0..100 %: under fastmath the floor can
+# round to a tiny negative value instead of exactly 0
+RMS_FLOOR = 1e-3
+RMS_CEIL = 1.0
+
+if njit is not None:
+    @njit(cache=True, fastmath=True, boundscheck=False)
+    def _level_percent(x, scale):
+        """Level (0-100%) of a 1-D block: RMS, dB and clamp in one pass"""
+        s = 0.0
+        for i in range(x.size):
+            v = float(x[i])
+            s += v * v
+        rms = min(RMS_CEIL, max(RMS_FLOOR, math.sqrt(s / x.size) * scale))
+        return max(0.0, min(100.0, (20.0 * math.log10(rms) + 60.0) * 1.67))
+else:
+    def _level_percent(x, scale):
+        """Level (0-100%) of a 1-D block"""
+        y = x.astype(np.float32, copy=False)
+        rms = min(RMS_CEIL, max(RMS_FLOOR, math.sqrt(float(np.dot(y, y)) / y.size) * scale))
+        return max(0.0, min(100.0, (20.0 * math.log10(rms) + 60.0) * 1.67))
+
+# Subtitle sets by level bucket: quiet (<= 25%), active (<= 50%), loud
+SYSTEM_AUDIO_SUBTITLES = (
+    ("🔊 System audio detected",
+     "🎵 Low volume content",
+     "📺 Quiet video/music",
+     "🎬 Background audio"),
+    ("🎵 Music or video playing",
+     "📺 Video content active",
+     "🔊 System audio detected",
+     "🎬 Content is playing"),
+    ("🔊 LOUD SYSTEM AUDIO!",
+     "🎵 HIGH VOLUME MUSIC/VIDEO",
+     "📺 INTENSE VIDEO SCENE",
+     "🎬 LOUD CONTENT PLAYING"),
+)
+MICROPHONE_SUBTITLES = (
+    ("🎤 Quiet speech",
+     "🗣️ Low volume talking",
+     "💬 Soft conversation",
+     "🎵 Gentle voice"),
+    ("🎤 Speech detected",
+     "🗣️ Someone is talking",
+     "💬 Conversation active",
+     "🎵 Voice audio"),
+    ("🔊 LOUD SPEECH DETECTED!",
+     "🎤 HIGH VOLUME TALKING",
+     "🗣️ LOUD CONVERSATION",
+     "📢 SHOUTING DETECTED"),
+)
+# Bucket for ceil(level) in 0..100, so "> 25" and "> 50" hold exactly
+LEVEL_BUCKETS = (0,) * 26 + (1,) * 25 + (2,) * 50
+
+_DEVICE_CACHE = None
+
+def cached_devices():
+    """sd.query_devices() probed once, plus lowercase names for matching"""
+    global _DEVICE_CACHE
+    if _DEVICE_CACHE is None:
+        devices = list(sd.query_devices())
+        names = [device.get('name', 'Unknown').lower() for device in devices]
+        _DEVICE_CACHE = (devices, names)
+    return _DEVICE_CACHE
+
 class RealtimeSubtitlesNow:
     def __init__(self):
         self.root = tk.Tk()
@@ -25,14 +97,28 @@ class RealtimeSubtitlesNow:
         
         # Audio settings
         self.sample_rate = 16000
-        self.chunk_size = 1024
-        self.audio_queue = queue.Queue()
+        # One level per 100 ms block: 1600 int16 samples = 3.2 KB per
+        # callback, well inside L1 for the level kernel
+        self.block_duration = 0.1
+        self.chunk_size = int(self.sample_rate * self.block_duration)
+        # Level (%) below which a block counts as silence; override with
+        # SUBTITLES_SILENCE_LEVEL to tune for noisy rooms
+        self.silence_level = float(os.environ.get("SUBTITLES_SILENCE_LEVEL", "8"))
+        # Per-block level and timestamp, kept as separate arrays sharing
+        # one write index; only these cross from the callback to _process_levels
+        self.level_slots = 64  # power of two
+        self.levels = np.zeros(self.level_slots, dtype=np.float32)
+        self.level_times = np.zeros(self.level_slots, dtype=np.float64)
+        self.level_head = 0
         self.subtitle_queue = queue.Queue()
+        self._gui_update_pending = False
         self.running = True
+        self.stop_event = threading.Event()
         
         # Audio device info
         self.current_device = None
         self.device_name = "Unknown"
+        self.is_blackhole = False
         
         # GUI elements
         self.setup_gui()
@@ -132,9 +218,6 @@ class RealtimeSubtitlesNow:
         main_frame.bind("<ButtonPress-1>", self._start_move)
         main_frame.bind("<B1-Motion>", self._on_move)
         
-        # Update GUI
-        self.update_gui()
-        
     def _start_move(self, event):
         self._drag_data["x"] = event.x
         self._drag_data["y"] = event.y
@@ -146,7 +229,7 @@ class RealtimeSubtitlesNow:
         
     def find_working_audio_device(self):
         """Find a working audio input device"""
-        devices = sd.query_devices()
+        devices, lower_names = cached_devices()
         working_device = None
         
         print("🔍 Finding working audio device...")
@@ -161,7 +244,7 @@ class RealtimeSubtitlesNow:
             print(f"      Inputs: {max_inputs}, Outputs: {max_outputs}")
             
             # Look for BlackHole first
-            if "blackhole" in name.lower() and max_inputs > 0:
+            if "blackhole" in lower_names[i] and max_inputs > 0:
                 working_device = i
                 print(f"      ⭐ BLACKHOLE FOUND! (Can capture system audio)")
                 break
@@ -171,10 +254,11 @@ class RealtimeSubtitlesNow:
                 print(f"      📱 Using this device (microphone only)")
         
         if working_device is not None:
-            device_info = sd.query_devices(working_device)
+            device_info = devices[working_device]
             self.device_name = device_info.get('name', 'Unknown')
+            self.is_blackhole = "blackhole" in lower_names[working_device]
             
-            if "blackhole" in self.device_name.lower():
+            if self.is_blackhole:
                 self.device_var.set(f"Audio Device: {self.device_name} ⭐")
                 self.status_var.set("Status: Can capture system audio + microphone!")
             else:
@@ -189,33 +273,56 @@ class RealtimeSubtitlesNow:
         
     def start_audio_capture(self):
         """Start audio capture from available device"""
-        # Find working device
-        device_id = self.find_working_audio_device()
-        if device_id is None:
-            return
-            
-        def audio_callback(indata, frames, time_info, status):
+        # Everything the stream needs is fixed once it is opened (mono int16,
+        # level arrays, scale), so resolve it here rather than per callback
+        levels = self.levels
+        level_times = self.level_times
+        mask = self.level_slots - 1
+        scale = 1.0 / 32768.0
+        
+        def audio_callback(indata, frames, time_info, status,
+                           frombuffer=np.frombuffer, int16=np.int16,
+                           level_of=_level_percent, now=time.time):
             if status:
                 print(f"Audio status: {status}")
             
+            # Raw mono int16 stream
+            samples = frombuffer(indata, dtype=int16)
+            
             # Calculate audio level
-            rms = np.sqrt(np.mean(indata**2))
-            db = 20 * np.log10(max(rms, 1e-10))
-            level_percent = max(0, min(100, (db + 60) * 1.67))
+            level_percent = level_of(samples, scale)
             
-            # Put audio data in queue
-            self.audio_queue.put((indata.copy(), level_percent))
+            # Publish level + timestamp for _process_levels
+            i = self.level_head & mask
+            levels[i] = level_percent
+            level_times[i] = now()
+            self.level_head += 1
         
         def audio_thread():
             try:
-                with sd.InputStream(device=device_id,
-                                  samplerate=self.sample_rate, 
-                                  channels=1, 
-                                  callback=audio_callback,
-                                  blocksize=self.chunk_size):
+                # Find working device here rather than in __init__ so the
+                # window comes up without waiting on PortAudio device
+                # enumeration; failures land in the status line below
+                device_id = self.find_working_audio_device()
+                if device_id is None:
+                    return
+                
+                # Compile (or load from cache) the level kernel here, not on
+                # PortAudio's thread during the first block. RawInputStream
+                # passes a writable cffi buffer, so warm up on a writable
+                # (bytearray-backed) int16 array to get that same version
+                _level_percent(np.frombuffer(bytearray(2), dtype=np.int16), scale)
+                
+                with sd.RawInputStream(device=device_id,
+                                     samplerate=self.sample_rate, 
+                                     channels=1, 
+                                     dtype='int16',
+                                     callback=audio_callback,
+                                     blocksize=self.chunk_size):
                     self.status_var.set("Status: Audio capture ACTIVE - Speak now!")
-                    while self.running:
-                        time.sleep(0.01)
+                    # The callback runs on PortAudio's thread; this thread
+                    # keeps the stream open and turns levels into subtitles
+                    self._process_levels()
             except Exception as e:
                 print(f"Audio error: {e}")
                 self.status_var.set(f"Status: Audio error - {str(e)[:30]}")
@@ -224,122 +331,84 @@ class RealtimeSubtitlesNow:
         self.audio_thread = threading.Thread(target=audio_thread, daemon=True)
         self.audio_thread.start()
         
-        # Start audio processing thread
-        self.audio_processing_thread = threading.Thread(target=self.audio_processing_thread, daemon=True)
-        self.audio_processing_thread.start()
-        
-    def audio_processing_thread(self):
-        """Process audio and generate real-time subtitles"""
-        audio_buffer = np.array([], dtype=np.float32)
-        buffer_duration = 1.5  # 1.5 seconds for faster response
-        buffer_samples = int(self.sample_rate * buffer_duration)
+    def _process_levels(self):
+        """Turn audio levels into subtitles; runs on the audio thread while the stream is open"""
         last_update = time.time()
+        seen_head = 0
+        subtitle_counter = 0
+        # Level display is throttled to ~30 Hz and skipped when unchanged
+        last_level_text = None
+        last_level_time = 0.0
         
         while self.running:
             try:
-                # Get audio data
-                audio_data, level = self.audio_queue.get(timeout=0.1)
+                # Wait for a new level from the audio callback; back off by
+                # half a block so wakeups track the block rate
+                if self.level_head == seen_head:
+                    self.stop_event.wait(self.block_duration / 2)
+                    continue
+                seen_head = self.level_head
                 
-                # Update level display
-                self.level_var.set(f"Audio Level: {level:.1f}%")
+                # Level and timestamp of the most recent block
+                i = (seen_head - 1) & (self.level_slots - 1)
+                level = float(self.levels[i])
+                block_time = float(self.level_times[i])
                 
-                # Add to buffer
-                if audio_data.ndim == 2:
-                    mono = audio_data.mean(axis=1)
-                else:
-                    mono = audio_data.flatten()
-                
-                audio_buffer = np.concatenate([audio_buffer, mono])
+                # Update level display
+                level_text = f"Audio Level: {level:.1f}%"
+                if level_text != last_level_text and block_time - last_level_time >= 1 / 30:
+                    self.level_var.set(level_text)
+                    last_level_text = level_text
+                    last_level_time = block_time
                 
-                # Process buffer when it's full
-                if len(audio_buffer) >= buffer_samples:
-                    # Keep only the last buffer_duration seconds
-                    audio_buffer = audio_buffer[-buffer_samples:]
+                # Generate subtitles based on audio level
+                if level > self.silence_level:
+                    current_time = block_time
+                    if current_time - last_update > 1.5:  # Update every 1.5 seconds
+                        
+                        # Different messages based on audio level and device type
+                        bucket = LEVEL_BUCKETS[math.ceil(level)]
+                        if self.is_blackhole:
+                            subtitles = SYSTEM_AUDIO_SUBTITLES[bucket]
+                        else:
+                            subtitles = MICROPHONE_SUBTITLES[bucket]
+                        
+                        # Rotate through the set (each holds 4 messages)
+                        subtitle = subtitles[subtitle_counter & 3]
+                        subtitle_counter += 1
+                        self.subtitle_queue.put(subtitle)
+                        self.schedule_gui_update()
+                        last_update = current_time
                     
-                    # Generate subtitles based on audio level
-                    if level > 8:  # Lower threshold for better sensitivity
-                        current_time = time.time()
-                        if current_time - last_update > 1.5:  # Update every 1.5 seconds
-                            
-                            # Different messages based on audio level and device type
-                            if "blackhole" in self.device_name.lower():
-                                # System audio capture
-                                if level > 50:
-                                    subtitles = [
-                                        "🔊 LOUD SYSTEM AUDIO!",
-                                        "🎵 HIGH VOLUME MUSIC/VIDEO",
-                                        "📺 INTENSE VIDEO SCENE",
-                                        "🎬 LOUD CONTENT PLAYING"
-                                    ]
-                                elif level > 25:
-                                    subtitles = [
-                                        "🎵 Music or video playing",
-                                        "📺 Video content active",
-                                        "🔊 System audio detected",
-                                        "🎬 Content is playing"
-                                    ]
-                                else:
-                                    subtitles = [
-                                        "🔊 System audio detected",
-                                        "🎵 Low volume content",
-                                        "📺 Quiet video/music",
-                                        "🎬 Background audio"
-                                    ]
-                            else:
-                                # Microphone capture
-                                if level > 50:
-                                    subtitles = [
-                                        "🔊 LOUD SPEECH DETECTED!",
-                                        "🎤 HIGH VOLUME TALKING",
-                                        "🗣️ LOUD CONVERSATION",
-                                        "📢 SHOUTING DETECTED"
-                                    ]
-                                elif level > 25:
-                                    subtitles = [
-                                        "🎤 Speech detected",
-                                        "🗣️ Someone is talking",
-                                        "💬 Conversation active",
-                                        "🎵 Voice audio"
-                                    ]
-                                else:
-                                    subtitles = [
-                                        "🎤 Quiet speech",
-                                        "🗣️ Low volume talking",
-                                        "💬 Soft conversation",
-                                        "🎵 Gentle voice"
-                                    ]
-                            
-                            import random
-                            subtitle = random.choice(subtitles)
-                            self.subtitle_queue.put(subtitle)
-                            last_update = current_time
-                    
-                    # Clear buffer after processing
-                    audio_buffer = np.array([], dtype=np.float32)
-                    
-            except queue.Empty:
-                continue
             except Exception as e:
                 print(f"Audio processing error: {e}")
                 
+    def schedule_gui_update(self):
+        """Ask the Tk loop to show new subtitles (at most one pending update)"""
+        if self.running and not self._gui_update_pending:
+            self._gui_update_pending = True
+            self.root.after(0, self.update_gui)
+    
     def update_gui(self):
         """Update the GUI with current subtitles"""
+        self._gui_update_pending = False
+        # Only the newest subtitle is visible, so drain to it and set once
+        latest = None
         try:
-            while not self.subtitle_queue.empty():
+            while True:
                 subtitle = self.subtitle_queue.get_nowait()
                 if subtitle.strip():
-                    self.current_subtitle_var.set(subtitle)
-                    
+                    latest = subtitle
         except queue.Empty:
             pass
         
-        # Schedule next update
-        if self.running:
-            self.root.after(50, self.update_gui)  # Faster updates for real-time feel
+        if latest is not None and latest != self.current_subtitle_var.get():
+            self.current_subtitle_var.set(latest)
     
     def quit_app(self):
         """Quit the application"""
         self.running = False
+        self.stop_event.set()
         self.root.quit()
     
     def run(self):
@@ -350,6 +419,7 @@ class RealtimeSubtitlesNow:
             pass
         finally:
             self.running = False
+            self.stop_event.set()
             print("Real-time subtitles stopped")
 
 def main():
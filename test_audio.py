@@ -6,14 +6,14 @@ Tests if we can capture audio from available devices
 
 import sounddevice as sd
 import numpy as np
+import math
 import time
 
-def list_audio_devices():
+def list_audio_devices(devices):
     """List all available audio devices"""
     print("Available Audio Devices:")
     print("=" * 50)
     
-    devices = sd.query_devices()
     for i, device in enumerate(devices):
         name = device.get('name', 'Unknown')
         max_inputs = device.get('max_input_channels', 0)
@@ -24,31 +24,40 @@ def list_audio_devices():
         print(f"     Inputs: {max_inputs}, Outputs: {max_outputs}, Sample Rate: {sample_rate}")
         print()
 
-def test_audio_capture(device_id, duration=5):
+def test_audio_capture(device_id, device_info, duration=5):
     """Test audio capture from a specific device"""
     print(f"Testing audio capture from device {device_id} for {duration} seconds...")
     
     try:
-        # Get device info
-        device_info = sd.query_devices(device_id)
+        # Show device info
         print(f"Device: {device_info.get('name', 'Unknown')}")
         print(f"Sample Rate: {device_info.get('default_samplerate', 'Unknown')}")
         print(f"Channels: {device_info.get('max_input_channels', 'Unknown')}")
         
-        # Capture audio
-        audio_data = sd.rec(int(duration * 44100), samplerate=44100, channels=1, dtype='float32', device=device_id)
-        print("Recording... Speak or play some audio...")
+        # Capture audio, accumulating the sum of squares per block instead
+        # of holding the whole recording in memory
+        sum_sq = 0.0
+        count = 0
+        
+        def callback(indata, frames, time_info, status):
+            nonlocal sum_sq, count
+            x = indata.ravel()
+            sum_sq += float(np.dot(x, x))
+            count += x.size
         
-        sd.wait()  # Wait for recording to complete
+        with sd.InputStream(samplerate=44100, channels=1, dtype='float32',
+                            device=device_id, callback=callback):
+            print("Recording... Speak or play some audio...")
+            sd.sleep(int(duration * 1000))  # Wait for recording to complete
         
         # Analyze the audio
-        rms = np.sqrt(np.mean(audio_data**2))
+        rms = math.sqrt(sum_sq / max(count, 1))
         db = 20 * np.log10(max(rms, 1e-10))
         
         print(f"Audio captured successfully!")
         print(f"RMS Level: {rms:.6f}")
         print(f"dB Level: {db:.2f} dB")
-        print(f"Audio shape: {audio_data.shape}")
+        print(f"Samples captured: {count}")
         
         if rms > 0.001:  # Threshold for detecting actual audio
             print("✅ Audio detected - device is working!")
@@ -62,11 +71,13 @@ def main():
     print("Audio Capture Test")
     print("=" * 30)
     
+    # Query devices once and reuse the list
+    devices = sd.query_devices()
+    
     # List all devices
-    list_audio_devices()
+    list_audio_devices(devices)
     
     # Test the first available input device
-    devices = sd.query_devices()
     input_devices = []
     
     for i, device in enumerate(devices):
@@ -77,7 +88,7 @@ def main():
         print(f"Found {len(input_devices)} input devices")
         test_device = input_devices[0]
         print(f"Testing first input device: {test_device}")
-        test_audio_capture(test_device)
+        test_audio_capture(test_device, devices[test_device])
     else:
         print("No input devices found!")
     